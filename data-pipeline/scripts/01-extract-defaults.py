@@ -9,92 +9,74 @@ Filters the raw CSV to only include:
 Input:  01-raw/NASA-Exoplanet-Archive_PS_*.csv
 Output: 02-processed/step1-defaults-only.csv
 
-Uses only standard library (no pandas required).
+Runs the extract_defaults stage of the pipeline graph (see pipeline.py).
+Rows are streamed from the lazy scan through the filter into the output
+file in batches, so memory stays bounded as the archive grows.
 """
 
-import csv
-from pathlib import Path
-from collections import Counter
+import polars as pl
 
-# Paths
-SCRIPT_DIR = Path(__file__).parent
-RAW_DIR = SCRIPT_DIR.parent / "01-raw"
-OUTPUT_DIR = SCRIPT_DIR.parent / "02-processed"
+from pipeline import (
+    ENGINE,
+    PROCESSED_DIR,
+    STEP1_FILE,
+    count_values,
+    extract_defaults,
+    find_raw_csv,
+    scan_raw,
+)
 
-# Find the raw CSV file
-csv_files = list(RAW_DIR.glob("NASA-Exoplanet-Archive_PS_*.csv"))
-if not csv_files:
-    raise FileNotFoundError(f"No NASA archive CSV found in {RAW_DIR}")
-
-input_file = csv_files[0]
+input_file = find_raw_csv()
 print(f"Reading: {input_file.name}")
 
-# Read and filter
-rows_total = 0
-rows_default = 0
-rows_output = 0
-planet_names = set()
-discovery_methods = Counter()
-discovery_years = []
-
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-output_file = OUTPUT_DIR / "step1-defaults-only.csv"
-
-with open(input_file, 'r', encoding='utf-8') as infile:
-    # Skip comment lines
-    lines = (line for line in infile if not line.startswith('#'))
-    reader = csv.DictReader(lines)
-
-    # Get header
-    fieldnames = reader.fieldnames
-
-    with open(output_file, 'w', newline='', encoding='utf-8') as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for row in reader:
-            rows_total += 1
-
-            # Filter: default_flag = 1
-            if row.get('default_flag') != '1':
-                continue
-            rows_default += 1
-
-            # Filter: not controversial
-            if row.get('pl_controv_flag') == '1':
-                continue
-
-            # Write row
-            writer.writerow(row)
-            rows_output += 1
-
-            # Track stats
-            planet_names.add(row['pl_name'])
-            discovery_methods[row.get('discoverymethod', 'Unknown')] += 1
-            year = row.get('disc_year')
-            if year:
-                try:
-                    discovery_years.append(int(float(year)))
-                except ValueError:
-                    pass
+PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+
+raw = scan_raw(input_file)
+defaults = extract_defaults(raw)
+
+# Write rows and track stats from the same scan
+_, counts, discovery_methods = pl.collect_all([
+    defaults.sink_csv(STEP1_FILE, lazy=True),
+    pl.concat(
+        [
+            raw.select(
+                rows_total=pl.len(),
+                rows_default=(pl.col('default_flag') == 1).sum(),
+            ),
+            defaults.select(
+                rows_output=pl.len(),
+                unique_planets=pl.col('pl_name').n_unique(),
+                earliest=pl.col('disc_year').min(),
+                latest=pl.col('disc_year').max(),
+            ),
+        ],
+        how='horizontal',
+    ),
+    # Empty cells are null here but were their own '' bucket before
+    count_values(
+        defaults.select(pl.col('discoverymethod').fill_null('')),
+        'discoverymethod',
+    ),
+], engine=ENGINE)
+counts = counts.row(0, named=True)
 
 print(f"\n=== Filtering Results ===")
-print(f"Total rows (all parameter sets): {rows_total:,}")
-print(f"Rows with default_flag=1: {rows_default:,}")
-print(f"After removing controversial: {rows_output:,}")
-print(f"Unique planet names: {len(planet_names):,}")
+print(f"Total rows (all parameter sets): {counts['rows_total']:,}")
+print(f"Rows with default_flag=1: {counts['rows_default']:,}")
+print(f"After removing controversial: {counts['rows_output']:,}")
+print(f"Unique planet names: {counts['unique_planets']:,}")
 
 # Check for duplicates
-if rows_output != len(planet_names):
-    print(f"WARNING: Row count ({rows_output}) != unique planets ({len(planet_names)})")
+if counts['rows_output'] != counts['unique_planets']:
+    print(f"WARNING: Row count ({counts['rows_output']}) != unique planets ({counts['unique_planets']})")
 
-print(f"\nOutput: {output_file}")
+print(f"\nOutput: {STEP1_FILE}")
 
 print("\n=== Detection Method Distribution ===")
-for method, count in discovery_methods.most_common():
+for method, count in discovery_methods.iter_rows():
     print(f"  {method}: {count:,}")
 
-if discovery_years:
+if counts['earliest'] is not None:
     print(f"\n=== Discovery Year Range ===")
-    print(f"  Earliest: {min(discovery_years)}")
-    print(f"  Latest: {max(discovery_years)}")
+    print(f"  Earliest: {counts['earliest']}")
+    print(f"  Latest: {counts['latest']}")
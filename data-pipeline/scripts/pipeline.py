@@ -0,0 +1,603 @@
+"""
+Shared pipeline stages
+
+Each stage takes and returns a Polars LazyFrame, so the full pipeline is a
+single query graph: the raw CSV is parsed once and intermediates stay in
+memory. The numbered scripts run the graph up to their stage and write the
+intermediate file for inspection; run_pipeline.py runs it end to end.
+
+1. extract_defaults   - canonical, non-controversial parameter sets
+2. select_columns     - rename + parse columns needed for visualization
+   clean              - drop planets without period, derive fields
+3. enrich             - attach narrative content, build planet records
+4. final_queries      - validate planets, compute statistics
+   write_final        - final JSON + statistics report
+"""
+
+import json
+from pathlib import Path
+from datetime import datetime
+
+import orjson
+import polars as pl
+
+# Paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent
+RAW_DIR = DATA_DIR / "01-raw"
+PROCESSED_DIR = DATA_DIR / "02-processed"
+ENRICHED_DIR = DATA_DIR / "03-enriched"
+FINAL_DIR = DATA_DIR / "04-final"
+
+STEP1_FILE = PROCESSED_DIR / "step1-defaults-only.csv"
+STEP2_FILE = PROCESSED_DIR / "step2-cleaned.csv"
+NARRATIVE_FILE = DATA_DIR / "narrative" / "notable-planets.json"
+ENRICHED_FILE = ENRICHED_DIR / "planets-enriched.json"
+OUTPUT_FILE = FINAL_DIR / "exoplanets.json"
+STATS_FILE = FINAL_DIR / "STATS.md"
+
+# Polars engine for collect()/collect_all(): the streaming engine runs the
+# graph in morsels across all cores instead of materializing each stage
+ENGINE = 'streaming'
+
+
+# =============================================================================
+# Step 1: Extract default parameter sets
+# =============================================================================
+
+def find_raw_csv():
+    """Locate the NASA archive CSV in 01-raw/."""
+    csv_files = list(RAW_DIR.glob("NASA-Exoplanet-Archive_PS_*.csv"))
+    if not csv_files:
+        raise FileNotFoundError(f"No NASA archive CSV found in {RAW_DIR}")
+    return csv_files[0]
+
+
+# Archive columns parsed to typed values by the CSV reader; all other
+# columns are read as strings and passed through untouched. disc_year is
+# read as a float so values like "2011.0" parse, then cast in scan_raw.
+RAW_SCHEMA = {
+    'default_flag': pl.Int8,
+    'pl_controv_flag': pl.Int8,
+    'disc_year': pl.Float64,
+    'pl_orbper': pl.Float64,
+    'pl_orbsmax': pl.Float64,
+    'pl_rade': pl.Float64,
+    'pl_bmasse': pl.Float64,
+    'pl_eqt': pl.Float64,
+    'pl_dens': pl.Float64,
+    'pl_orbeccen': pl.Float64,
+    'pl_insol': pl.Float64,
+    'st_teff': pl.Float64,
+    'st_rad': pl.Float64,
+    'st_mass': pl.Float64,
+    'sy_dist': pl.Float64,
+    'ra': pl.Float64,
+    'dec': pl.Float64,
+}
+
+# Values treated as missing in any column. "nan" is only missing in the
+# numeric columns: it parses to NaN there and scan_raw turns NaN into null,
+# while string columns keep the literal text.
+NULL_VALUES = ['']
+
+
+def scan_raw(input_file):
+    """Lazily scan the raw archive CSV with typed numeric columns.
+
+    Malformed numeric cells become null instead of failing the scan.
+    """
+    return pl.scan_csv(
+        input_file,
+        comment_prefix='#',
+        infer_schema=False,
+        schema_overrides=RAW_SCHEMA,
+        null_values=NULL_VALUES,
+        ignore_errors=True,
+    ).with_columns(
+        pl.col(pl.Float64).exclude('disc_year').fill_nan(None),
+        pl.col('disc_year').cast(pl.Int16, strict=False),
+    )
+
+
+def extract_defaults(lf):
+    """Keep default_flag = 1 rows that aren't flagged controversial."""
+    return lf.filter(
+        (pl.col('default_flag') == 1)
+        & pl.col('pl_controv_flag').ne_missing(1)
+    )
+
+
+# =============================================================================
+# Step 2: Select relevant columns, map detection methods, clean data
+# =============================================================================
+
+# Column mapping: archive name -> output name
+COLUMN_MAP = {
+    'pl_name': 'name',
+    'hostname': 'hostStar',
+    'pl_orbper': 'period',
+    'pl_orbsmax': 'separation',
+    'pl_rade': 'radius',
+    'pl_bmasse': 'mass',
+    'pl_bmassprov': 'massProvenance',
+    'discoverymethod': 'detectionMethod',
+    'disc_year': 'discoveryYear',
+    'disc_facility': 'facility',
+    'pl_eqt': 'temperature',
+    'pl_dens': 'density',
+    'pl_orbeccen': 'eccentricity',
+    'pl_insol': 'insolation',
+    'st_spectype': 'starSpectralType',
+    'st_teff': 'starTemperature',
+    'st_rad': 'starRadius',
+    'st_mass': 'starMass',
+    'sy_dist': 'distance',
+    'ra': 'ra',
+    'dec': 'dec',
+}
+
+# Detection method mapping
+# Transit will be split based on facility
+DETECTION_METHOD_MAP = {
+    'Transit': 'transit',  # Will be refined below
+    'Radial Velocity': 'radial-velocity',
+    'Microlensing': 'microlensing',
+    'Imaging': 'direct-imaging',
+    'Astrometry': 'astrometry',
+    'Transit Timing Variations': 'transit-other',
+    'Eclipse Timing Variations': 'other',
+    'Pulsar Timing': 'other',
+    'Orbital Brightness Modulation': 'other',
+    'Pulsation Timing Variations': 'other',
+    'Disk Kinematics': 'other',
+}
+
+# Kepler/K2 facilities (literal substring match against disc_facility)
+KEPLER_FACILITIES = ['Kepler', 'K2', 'Kepler/K2']
+
+# Visualization categories, stored as Enum (integer codes) rather than strings
+DETECTION_METHODS = pl.Enum([
+    'transit-kepler',
+    'transit-other',
+    'radial-velocity',
+    'microlensing',
+    'direct-imaging',
+    'astrometry',
+    'other',
+])
+PLANET_TYPES = pl.Enum([
+    'rocky',
+    'super-earth',
+    'sub-neptune',
+    'neptune-like',
+    'hot-jupiter',
+    'cold-jupiter',
+    'unknown',
+])
+
+# Julian year, for converting orbital periods to years
+DAYS_PER_YEAR = 365.25
+
+# Step 2 CSV column order
+CLEANED_FIELDS = list(COLUMN_MAP.values()) + ['planetType']
+
+
+def calculate_separation(period_days, star_mass_solar):
+    """Calculate semi-major axis from period using Kepler's third law."""
+    # a^3 = (P/365.25)^2 * M_star (in AU, days, solar masses)
+    period_years = period_days / DAYS_PER_YEAR
+    return (period_years ** 2 * star_mass_solar).cbrt()
+
+
+def map_detection_method(method, facility):
+    """Map archive detection method to visualization category."""
+    return (
+        pl.when((method == 'Transit') & facility.str.contains_any(KEPLER_FACILITIES))
+        .then(pl.lit('transit-kepler'))
+        .when(method == 'Transit')
+        .then(pl.lit('transit-other'))
+        .otherwise(method.replace_strict(DETECTION_METHOD_MAP, default='other'))
+        .cast(DETECTION_METHODS)
+    )
+
+
+def estimate_radius(mass, radius):
+    """Use radius if available, otherwise estimate from mass."""
+    return (
+        pl.when(radius != 0).then(radius)
+        .when((mass != 0) & (mass < 10)).then(mass ** 0.28)
+    )
+
+
+def estimate_mass(mass, radius_estimate):
+    """Use mass if available, otherwise estimate from radius (rough)."""
+    return (
+        pl.when(mass.is_not_null()).then(mass)
+        .when(radius_estimate < 1.5).then(radius_estimate ** 3.3)
+        .otherwise(radius_estimate ** 2.1 * 2)
+    )
+
+
+def classify_planet(m, r, period):
+    """Classify planet type from estimated mass/radius (compositional types only)."""
+    return (
+        # If we have neither mass nor radius, can't classify
+        pl.when(m.is_null()).then(pl.lit('unknown'))
+        # Hot Jupiter: massive + short period
+        .when((m > 100) & (period != 0) & (period < 10)).then(pl.lit('hot-jupiter'))
+        # Cold Jupiter: massive + long period
+        .when(m > 100).then(pl.lit('cold-jupiter'))
+        # Neptune-like: 10-50 Earth masses
+        .when((m >= 10) & (m < 50)).then(pl.lit('neptune-like'))
+        # Sub-Neptune: by radius 2-4 Earth radii
+        .when((r >= 2) & (r < 4)).then(pl.lit('sub-neptune'))
+        # Super-Earth: 2-10 Earth masses
+        .when((m >= 2) & (m < 10)).then(pl.lit('super-earth'))
+        # Rocky: < 2 Earth masses
+        .when(m < 2).then(pl.lit('rocky'))
+        .otherwise(pl.lit('sub-neptune'))  # Default
+        .cast(PLANET_TYPES)
+    )
+
+
+def select_columns(lf):
+    """Select and rename visualization columns (already typed by scan_raw)."""
+    # On a lazy scan this select is pushed down into the CSV reader, so only
+    # the COLUMN_MAP columns (plus the step 1 flags) are parsed at all. Keep
+    # the graph lazy up to here to preserve that.
+    return lf.select([pl.col(src).alias(dst) for src, dst in COLUMN_MAP.items()])
+
+
+def clean(lf):
+    """Drop planets without period, derive separation, method and type."""
+    period = pl.col('period')
+    star_mass = pl.col('starMass')
+
+    return (
+        lf
+        # Skip planets without period (can't visualize)
+        .filter(period.is_not_null())
+        .with_columns(
+            # Calculate separation if missing
+            separation=pl.coalesce(
+                pl.col('separation'),
+                calculate_separation(
+                    period,
+                    pl.when(star_mass != 0).then(star_mass).otherwise(1.0),
+                ),
+            ),
+            detectionMethod=map_detection_method(
+                pl.col('detectionMethod'), pl.col('facility')
+            ),
+            _radiusEstimate=estimate_radius(pl.col('mass'), pl.col('radius')),
+        )
+        # Materialize the estimates once so the classification ladder is
+        # plain comparisons instead of re-evaluating them in every branch
+        .with_columns(
+            _massEstimate=estimate_mass(pl.col('mass'), pl.col('_radiusEstimate')),
+        )
+        .with_columns(
+            planetType=classify_planet(
+                pl.col('_massEstimate'), pl.col('_radiusEstimate'), period
+            ),
+        )
+        .drop('_radiusEstimate', '_massEstimate')
+    )
+
+
+# =============================================================================
+# Step 3: Enrich cleaned data with narrative content
+# =============================================================================
+
+# Numeric planet record fields, in output order
+NUMBER_FIELDS = [
+    'period',
+    'separation',
+    'radius',
+    'mass',
+    'discoveryYear',
+    'temperature',
+    'density',
+    'eccentricity',
+    'insolation',
+    'starTemperature',
+    'starRadius',
+    'starMass',
+    'distance',
+    'ra',
+    'dec',
+]
+STRING_FIELDS = [
+    'massProvenance',
+    'detectionMethod',
+    'facility',
+    'starSpectralType',
+    'planetType',
+]
+OBSERVED_FIELDS = ['period', 'mass', 'radius', 'temperature', 'separation']
+NARRATIVE_FIELDS = ['isNotable', 'notableReason', 'description', 'sources']
+
+
+def generate_id(name):
+    """Generate a stable ID from planet name."""
+    return 'exo-' + name.str.to_lowercase().str.replace_many({' ': '-', '+': 'plus'})
+
+
+def load_narrative():
+    """Load notable planet descriptions as a LazyFrame keyed by name."""
+    narrative_data = {}
+    if NARRATIVE_FILE.exists():
+        with open(NARRATIVE_FILE, 'r', encoding='utf-8') as f:
+            narrative_data = json.load(f).get('planets', {})
+        print(f"Loaded narrative for {len(narrative_data)} notable planets")
+    else:
+        print("Warning: No narrative file found")
+
+    return pl.LazyFrame(
+        {
+            'name': list(narrative_data),
+            'isNotable': [n.get('isNotable', False) for n in narrative_data.values()],
+            'notableReason': [n.get('notableReason') for n in narrative_data.values()],
+            'description': [n.get('description') for n in narrative_data.values()],
+            'sources': [n.get('sources', []) for n in narrative_data.values()],
+            '_hasNarrative': [True] * len(narrative_data),
+        },
+        schema={
+            'name': pl.String,
+            'isNotable': pl.Boolean,
+            'notableReason': pl.String,
+            'description': pl.String,
+            'sources': pl.List(pl.String),
+            '_hasNarrative': pl.Boolean,
+        },
+    )
+
+
+def enrich(lf, narrative):
+    """Merge narrative content and build planet records, sorted by discovery."""
+    return (
+        # Both the join and the sort keep input order, so planets sharing a
+        # (discoveryYear, name) key stay in archive order like list.sort
+        lf.join(narrative, on='name', how='left', maintain_order='left')
+        # Sort by discovery year, then name
+        .sort(pl.col('discoveryYear').fill_null(9999), 'name', maintain_order=True)
+        .select(
+            generate_id(pl.col('name')).alias('id'),
+            'name',
+            'hostStar',
+            pl.lit(False).alias('isSolarSystem'),
+            *NUMBER_FIELDS,
+            *STRING_FIELDS,
+            # Track which fields are observed
+            pl.struct(
+                [pl.col(field).is_not_null() for field in OBSERVED_FIELDS]
+            ).alias('_observed'),
+            # Add narrative content if available
+            pl.when(pl.col('_hasNarrative'))
+            .then(pl.struct(NARRATIVE_FIELDS))
+            .alias('_narrative'),
+        )
+    )
+
+
+def indent_json(data, depth):
+    """Re-indent orjson OPT_INDENT_2 output for nesting at the given depth."""
+    return data.replace(b'\n', b'\n' + b'  ' * depth)
+
+
+def write_planets(path, metadata, planets):
+    """Stream {"metadata": ..., "planets": [...]} one planet row at a time.
+
+    Output is 2-space indented UTF-8, matching json.dump(indent=2), but only
+    one record dict is alive at a time.
+    """
+    with open(path, 'wb') as f:
+        f.write(b'{\n  "metadata": ')
+        f.write(indent_json(orjson.dumps(metadata, option=orjson.OPT_INDENT_2), 1))
+        f.write(b',\n  "planets": [')
+
+        for i, planet in enumerate(planets.iter_rows(named=True)):
+            f.write(b',\n    ' if i else b'\n    ')
+            f.write(indent_json(orjson.dumps(planet, option=orjson.OPT_INDENT_2), 2))
+
+        f.write(b'\n  ]\n}' if len(planets) else b']\n}')
+
+
+def write_enriched(planets):
+    """Write the step 3 intermediate JSON (planet records + metadata)."""
+    ENRICHED_DIR.mkdir(parents=True, exist_ok=True)
+
+    notable_count = planets['_narrative'].is_not_null().sum()
+    metadata = {
+        'processedDate': '2025-12-26',
+        'planetCount': len(planets),
+        'notableCount': notable_count,
+        'step': 'enriched',
+    }
+    write_planets(ENRICHED_FILE, metadata, planets)
+
+    print(f"\nOutput: {ENRICHED_FILE}")
+    print(f"  Total planets: {len(planets):,}")
+    print(f"  Notable planets with narrative: {notable_count}")
+
+
+def build_planets(input_file):
+    """Full stage 1-3 graph from the raw archive CSV to planet records."""
+    return enrich(
+        clean(select_columns(extract_defaults(scan_raw(input_file)))),
+        load_narrative(),
+    )
+
+
+# =============================================================================
+# Step 4: Generate final visualization-ready JSON
+# =============================================================================
+
+def count_values(lf, column):
+    """Count a column's values, most common first (ties in first-seen order).
+
+    Same ordering as Counter.most_common().
+    """
+    return (
+        lf.group_by(column, maintain_order=True)
+        .len()
+        .sort('len', descending=True, maintain_order=True)
+    )
+
+
+def simplify_facility(facility):
+    """Collapse Kepler/K2/TESS/HARPS facility names for the stats report."""
+    return (
+        pl.when(facility.str.contains('Kepler', literal=True)).then(pl.lit('Kepler'))
+        .when(facility.str.contains('K2', literal=True)).then(pl.lit('K2'))
+        .when(facility.str.contains('TESS', literal=True)).then(pl.lit('TESS'))
+        .when(facility.str.contains('HARPS', literal=True)).then(pl.lit('HARPS'))
+        .otherwise(facility)
+    )
+
+
+def final_queries(planets):
+    """Lazy queries for write_final: validated planets plus statistics."""
+    # Required fields check
+    has_period = pl.col('period').fill_null(0) != 0
+    valid = planets.filter(has_period)
+
+    return {
+        'planets': valid,
+        'issues': planets.filter(~has_period).select('name'),
+        'coverage': pl.concat(
+            [
+                planets.select(total=pl.len()),
+                valid.select(
+                    with_mass=(pl.col('mass').fill_null(0) != 0).sum(),
+                    with_radius=(pl.col('radius').fill_null(0) != 0).sum(),
+                    with_temperature=(pl.col('temperature').fill_null(0) != 0).sum(),
+                    with_narrative=pl.col('_narrative').is_not_null().sum(),
+                ),
+            ],
+            how='horizontal',
+        ),
+        'detection_methods': count_values(valid, 'detectionMethod'),
+        'planet_types': count_values(valid, 'planetType'),
+        'facilities': count_values(
+            valid.select(facility=simplify_facility(pl.col('facility'))).drop_nulls(),
+            'facility',
+        ).head(10),
+        'decades': (
+            valid.select(decade=pl.col('discoveryYear') // 10 * 10)
+            .drop_nulls()
+            .group_by('decade')
+            .len()
+            .sort('decade')
+        ),
+    }
+
+
+def collect_queries(queries):
+    """Collect a dict of LazyFrames in one pass, sharing common subplans."""
+    return dict(zip(queries, pl.collect_all(queries.values(), engine=ENGINE)))
+
+
+def write_final(final):
+    """Stream final JSON and write statistics report from final_queries()."""
+    FINAL_DIR.mkdir(parents=True, exist_ok=True)
+
+    valid_planets = final['planets']
+    issues = [f"{name}: missing period" for name in final['issues']['name']]
+    stats = final['coverage'].row(0, named=True)
+
+    metadata = {
+        'source': 'NASA Exoplanet Archive',
+        'sourceUrl': 'https://exoplanetarchive.ipac.caltech.edu/',
+        'dataTable': 'Planetary Systems (PS)',
+        'downloadDate': '2025-12-26',
+        'processedDate': datetime.now().strftime('%Y-%m-%d'),
+        'pipelineVersion': '1.0.0',
+        'planetCount': len(valid_planets),
+        'citation': 'NASA Exoplanet Archive, operated by Caltech under contract with NASA',
+    }
+
+    write_planets(OUTPUT_FILE, metadata, valid_planets)
+
+    print(f"\nOutput: {OUTPUT_FILE}")
+    print(f"  Total planets: {len(valid_planets):,}")
+
+    # Generate statistics report: build each table's rows, then assemble
+    # the document in one f-string
+    total = stats['total']
+    method_rows = "".join(
+        f"| {method} | {count:,} | {100 * count / total:.1f}% |\n"
+        for method, count in final['detection_methods'].iter_rows()
+    )
+    type_rows = "".join(
+        f"| {ptype} | {count:,} | {100 * count / total:.1f}% |\n"
+        for ptype, count in final['planet_types'].iter_rows()
+    )
+    facility_rows = "".join(
+        f"| {facility} | {count:,} |\n"
+        for facility, count in final['facilities'].iter_rows()
+    )
+    decade_rows = "".join(
+        f"| {decade}s | {count:,} |\n"
+        for decade, count in final['decades'].iter_rows()
+    )
+
+    issues_section = ""
+    if issues:
+        issue_rows = "".join(f"- {issue}\n" for issue in issues[:20])
+        if len(issues) > 20:
+            issue_rows += f"- ... and {len(issues) - 20} more\n"
+        issues_section = f"""
+## Data Issues
+
+{len(issues)} planets excluded:
+
+{issue_rows}"""
+
+    stats_md = f"""# Exoplanet Dataset Statistics
+
+Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+## Overview
+
+| Metric | Count |
+|--------|-------|
+| Total planets | {total:,} |
+| With mass measurement | {stats['with_mass']:,} ({100*stats['with_mass']/total:.1f}%) |
+| With radius measurement | {stats['with_radius']:,} ({100*stats['with_radius']/total:.1f}%) |
+| With temperature estimate | {stats['with_temperature']:,} ({100*stats['with_temperature']/total:.1f}%) |
+| With narrative description | {stats['with_narrative']:,} |
+
+## Detection Methods
+
+| Method | Count | Percentage |
+|--------|-------|------------|
+{method_rows}
+## Planet Types
+
+| Type | Count | Percentage |
+|------|-------|------------|
+{type_rows}
+## Top Discovery Facilities
+
+| Facility | Count |
+|----------|-------|
+{facility_rows}
+## Discovery Timeline
+
+| Decade | Count |
+|--------|-------|
+{decade_rows}{issues_section}"""
+
+    with open(STATS_FILE, 'w', encoding='utf-8') as f:
+        f.write(stats_md)
+
+    print(f"Stats report: {STATS_FILE}")
+
+    # Summary
+    print(f"\n=== Final Dataset ===")
+    print(f"  Planets: {len(valid_planets):,}")
+    print(f"  With mass: {stats['with_mass']:,}")
+    print(f"  With radius: {stats['with_radius']:,}")
+    print(f"  Notable: {stats['with_narrative']:,}")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Run the full pipeline in a single pass
+
+Reads the raw archive CSV once and runs steps 1-4 as one Polars query
+graph, with no intermediate files between stages.
+
+Input:  01-raw/NASA-Exoplanet-Archive_PS_*.csv
+        narrative/notable-planets.json
+Output: 04-final/exoplanets.json
+        04-final/STATS.md
+
+With --write-intermediate, the step 1-3 outputs (02-processed/*.csv,
+03-enriched/planets-enriched.json) are also written from the same pass.
+"""
+
+import argparse
+
+from pipeline import (
+    CLEANED_FIELDS,
+    PROCESSED_DIR,
+    STEP1_FILE,
+    STEP2_FILE,
+    clean,
+    collect_queries,
+    enrich,
+    extract_defaults,
+    final_queries,
+    find_raw_csv,
+    load_narrative,
+    scan_raw,
+    select_columns,
+    write_enriched,
+    write_final,
+)
+
+parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+parser.add_argument(
+    '--write-intermediate',
+    action='store_true',
+    help='also write the step 1-3 intermediate files for debugging',
+)
+args = parser.parse_args()
+
+input_file = find_raw_csv()
+print(f"Reading: {input_file.name}")
+
+defaults = extract_defaults(scan_raw(input_file))
+cleaned = clean(select_columns(defaults))
+planets = enrich(cleaned, load_narrative())
+
+# Final table and statistics come out of the same collect
+queries = final_queries(planets)
+
+if args.write_intermediate:
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    queries.update(
+        step1=defaults.sink_csv(STEP1_FILE, lazy=True),
+        step2=cleaned.select(CLEANED_FIELDS).sink_csv(STEP2_FILE, lazy=True),
+        enriched=planets,
+    )
+
+results = collect_queries(queries)
+
+if args.write_intermediate:
+    print(f"\nOutput: {STEP1_FILE}")
+    print(f"Output: {STEP2_FILE}")
+    write_enriched(results['enriched'])
+
+write_final(results)